@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+build_gallery.py のフォルダー走査のうち、拡張子の判定を Numba でまとめて行う任意のモジュール。
+
+numba / numpy がインストールされていれば build_gallery.py が自動で使う（_scan_fast が優先）。
+ファイル名を UCS-4 のコードポイント配列に詰め、拡張子を小文字化して uint64 に
+パックしたキーで表を引くところまでを nopython ループで処理する。
+JIT のコンパイルコスト（と numba / numpy の import 自体の時間）があるので、
+ファイル数が少ないフォルダーは通常の判定で済ませ、numba は必要になって初めて import する。
+"""
+
+from __future__ import annotations
+import os
+import threading
+from importlib.util import find_spec
+
+# 実際の import は遅らせるが、入っていない環境では build_gallery.py が別の実装を選べるようにする
+if find_spec("numba") is None or find_spec("numpy") is None:
+    raise ImportError("_scan_numba には numba と numpy が必要です")
+
+np = None  # numpy。_load() で初めて import する
+
+# これ未満のエントリ数のフォルダーは JIT 関数を使わない
+BATCH_MIN_ENTRIES = 4096
+
+# パックできる拡張子の最大長（1 文字 1 バイト × 8）
+_MAX_EXT_LEN = 8
+
+
+def _pack_ext(ext: str) -> int:
+    """拡張子（小文字 ASCII）をリトルエンディアンで uint64 にパックする。"""
+    return int.from_bytes(ext.encode("ascii").ljust(_MAX_EXT_LEN, b"\0"), "little")
+
+
+def classify_batch(chars, keys, codes, out):
+    """
+    chars[i] のファイル名（NUL 埋めのコードポイント列）の拡張子を判定し、out[i] に種別コードを入れる。
+    keys はパック済み拡張子の昇順配列、codes はそれに対応する種別コード。対応外は 0。
+    """
+    n, width = chars.shape
+    for i in range(n):
+        out[i] = 0
+        end = width
+        while end > 0 and chars[i, end - 1] == 0:
+            end -= 1
+        dot = end - 1
+        while dot >= 0 and chars[i, dot] != 46:  # '.'
+            dot -= 1
+        ext_len = end - dot - 1
+        if dot < 0 or ext_len == 0 or ext_len > 8:
+            continue
+        key = np.uint64(0)
+        ascii_only = True
+        for j in range(ext_len):
+            c = chars[i, dot + 1 + j]
+            if c > 127:
+                ascii_only = False
+                break
+            if 65 <= c <= 90:  # 'A'..'Z'
+                c += 32
+            key |= np.uint64(c) << np.uint64(8 * j)
+        if not ascii_only:
+            continue
+        k = np.searchsorted(keys, key)
+        if k < keys.size and keys[k] == key:
+            out[i] = codes[k]
+
+
+_jit_lock = threading.Lock()
+_jit_classify_batch = None
+_jit_unavailable = False
+
+
+def _load():
+    """
+    numba / numpy を import して classify_batch を JIT する（初回のみ。フォルダー走査はスレッド並列なのでロックする）。
+    入ってはいるが import できない（numba が NumPy のバージョンを拒否するなど）ときは None を返す。
+    """
+    global np, _jit_classify_batch, _jit_unavailable
+    with _jit_lock:
+        if _jit_classify_batch is None and not _jit_unavailable:
+            try:
+                import numpy
+                from numba import njit
+            except ImportError:
+                _jit_unavailable = True
+            else:
+                np = numpy
+                _jit_classify_batch = njit(cache=True, nogil=True)(classify_batch)
+    return _jit_classify_batch
+
+
+def _ext_table(ext_kind: dict[str, str]) -> tuple[np.ndarray, np.ndarray, list[str | None]]:
+    """ext_kind から (パック済みキー, 種別コード, コード → 種別) を作る。"""
+    kinds: list[str | None] = [None, *sorted(set(ext_kind.values()))]
+    code_of = {kind: i for i, kind in enumerate(kinds)}
+    packed = sorted(
+        (_pack_ext(ext), code_of[kind])
+        for ext, kind in ext_kind.items()
+        if ext.isascii() and len(ext) <= _MAX_EXT_LEN
+    )
+    keys = np.array([key for key, _ in packed], dtype=np.uint64)
+    codes = np.array([code for _, code in packed], dtype=np.uint8)
+    return keys, codes, kinds
+
+
+def scan_artist(path: str, url_prefix: str, ext_kind: dict[str, str]) -> list[tuple[str, str, str]]:
+    """path 直下のメディアファイルを (ファイル名, URL, 種別) のリストで返す（順不同）。"""
+    with os.scandir(path) as it:
+        entries = list(it)
+    names = [entry.name for entry in entries]
+
+    jit_classify_batch = _load() if len(names) >= BATCH_MIN_ENTRIES else None
+    if jit_classify_batch is None:
+        kinds = []
+        for name in names:
+            i = name.rfind(".")
+            kinds.append(ext_kind.get(name[i + 1:].lower()) if i >= 0 else None)
+    else:
+        keys, codes, kind_names = _ext_table(ext_kind)
+        chars = np.array(names, dtype=str)
+        chars = chars.view(np.uint32).reshape(len(names), -1)
+        out = np.empty(len(names), dtype=np.uint8)
+        jit_classify_batch(chars, keys, codes, out)
+        kinds = [kind_names[code] for code in out.tolist()]
+
+    return [
+        (entry.name, url_prefix + entry.name, kind)
+        for entry, kind in zip(entries, kinds)
+        if kind is not None and entry.is_file()
+    ]
@@ -5,11 +5,15 @@
 - サブフォルダーごとにタブ（例: artist1, artist2）を作成
 - 画像はサムネイル表示 → クリックで拡大表示
 - 動画は再生アイコン付きのサムネ表示 → クリックでモーダル再生
-- pathlib のみを使用（os.path 非使用）
+- 走査は os.scandir（DirEntry の型情報キャッシュで stat を省略）、os.path は非使用
 
 使い方:
   $ python build_gallery.py
-  # your_project/index.html が生成されます
+  # your_project/index.html が生成されます（media/ に変更が無ければ何もしません）
+  $ python build_gallery.py --force
+  # 変更の有無に関係なく再生成します
+  $ python build_gallery.py --debug
+  # HTML/CSS/JS を縮小せずに再生成します（開発用）
 
 構成（例）:
   your_project/
@@ -25,13 +29,26 @@
 """
 
 from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
-from html import escape
+from typing import NamedTuple
 
 # ===== 設定 =====
 ROOT_DIR: Path = Path(__file__).parent.resolve()
 MEDIA_DIR: Path = ROOT_DIR / "media"
 OUTPUT_HTML: Path = ROOT_DIR / "index.html"
+ASSETS_DIR: Path = ROOT_DIR / "assets"
+# 更新チェックで index.html の mtime（走査開始時刻）を早めに見積もる幅
+MTIME_SLACK_NS = 2_000_000_000
 
 # 対応拡張子（すべて小文字・ドット無し）
 IMAGE_EXTS = {
@@ -40,21 +57,46 @@ IMAGE_EXTS = {
 VIDEO_EXTS = {
     "mp4", "webm", "ogv", "mov", "m4v"
 }
-ALL_EXTS = IMAGE_EXTS | VIDEO_EXTS
+# 拡張子 → 種別（"image" | "video"）
+EXT_KIND: dict[str, str] = {ext: "image" for ext in IMAGE_EXTS} | {ext: "video" for ext in VIDEO_EXTS}
 
 
-def is_media_file(p: Path) -> bool:
-    return p.is_file() and p.suffix.lower().lstrip(".") in ALL_EXTS
+class Item(NamedTuple):
+    """タブ内のメディアファイル 1 つ（件数が多くなるので dict ではなくタプルで持つ）。"""
+    url: str   # index.html からの相対 URL
+    name: str  # ファイル名
+    kind: str  # "image" | "video"
 
 
-def is_image(p: Path) -> bool:
-    return p.suffix.lower().lstrip(".") in IMAGE_EXTS
+def classify(name: str, ext_kind: dict[str, str] = EXT_KIND) -> str | None:
+    """ファイル名から種別（"image" | "video"）を返す。対応外なら None。"""
+    i = name.rfind(".")
+    return ext_kind.get(name[i + 1:].lower()) if i >= 0 else None
 
 
-def is_video(p: Path) -> bool:
-    return p.suffix.lower().lstrip(".") in VIDEO_EXTS
+# html.escape(quote=True) と同じ置換を str.translate の 1 パスで行う
+_HTML_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+_UNSAFE_RE = re.compile(r"[&<>\"']")
 
 
+def _py_escape(s: str) -> str:
+    """HTML エスケープ。ファイル名の大半は該当文字を含まないので、その場合はそのまま返す。"""
+    if not _UNSAFE_RE.search(s):
+        return s
+    return s.translate(_HTML_TABLE)
+
+
+# markupsafe（C 実装の escape を持つ）があればそちらを使う。戻り値は str のサブクラス Markup
+try:
+    from markupsafe import escape as e
+except ImportError:
+    e = _py_escape
 
 
 def rel_url(path: Path) -> str:
@@ -62,237 +104,305 @@ def rel_url(path: Path) -> str:
     return path.relative_to(ROOT_DIR).as_posix()
 
 
-def build_gallery_data(media_root: Path) -> list[dict]:
+def _py_scan_artist(path: str, url_prefix: str, ext_kind: dict[str, str]) -> list[tuple[str, str, str]]:
+    """path 直下のメディアファイルを (ファイル名, URL, 種別) のリストで返す（順不同）。"""
+    found: list[tuple[str, str, str]] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            kind = classify(entry.name, ext_kind)
+            if kind is not None and entry.is_file():
+                found.append((entry.name, url_prefix + entry.name, kind))
+    return found
+
+
+# ビルド済みの C 拡張（_scan_fast.pyx）→ Numba 版（_scan_numba.py）→ 純 Python 版の順に使う
+try:
+    from _scan_fast import scan_artist
+except ImportError:
+    try:
+        from _scan_numba import scan_artist
+    except ImportError:
+        scan_artist = _py_scan_artist
+
+
+# (フォルダーのパス, media_url) → (フォルダーの mtime_ns, タブ)。
+# build_gallery_data(use_cache=True) を同じプロセスで繰り返し呼んだとき、変わっていないフォルダーは走査しない
+_scan_cache: dict[tuple[str, str], tuple[int, dict | None]] = {}
+
+
+def _build_tab(sub: os.DirEntry, media_url: str) -> dict | None:
+    """
+    アーティストフォルダー 1 つを走査してタブの dict を返す。メディアが無ければ None。
+    URL は media_url（media/ の相対 URL）とフォルダー名・ファイル名を連結するだけで作る。
+    """
+    files = scan_artist(sub.path, f"{media_url}/{sub.name}/", EXT_KIND)
+    if not files:
+        return None
+    files.sort(key=lambda t: t[0].lower())  # key はファイルごとに一度だけ計算される
+    return {
+        "name": sub.name,
+        "slug": sub.name,
+        "items": [Item(url, name, kind) for name, url, kind in files],
+    }
+
+
+def _scan_artist(sub: os.DirEntry, media_url: str, use_cache: bool = False) -> dict | None:
+    """
+    _build_tab の結果を返す。
+    use_cache=True なら、フォルダーの mtime が前回と同じときキャッシュした結果をそのまま返す（呼び出し側で変更しないこと）。
+    """
+    if not use_cache:
+        return _build_tab(sub, media_url)
+
+    key = (sub.path, media_url)
+    mtime_ns = sub.stat().st_mtime_ns
+    cached = _scan_cache.get(key)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    tab = _build_tab(sub, media_url)
+    _scan_cache[key] = (mtime_ns, tab)
+    return tab
+
+
+def build_gallery_data(media_root: Path, use_cache: bool = False) -> list[dict]:
     """
     media_root 直下のディレクトリをアーティスト（タブ）として扱い、
     その中のメディアファイルを列挙したデータ構造を返します。
+    監視ループなどで繰り返し呼ぶ場合は use_cache=True にすると、mtime が変わっていない
+    フォルダーは前回の結果を使います（フォルダーごとに stat が 1 回増えるので、1 回きりの実行では使わない）。
     戻り値の各要素：{
       "name": フォルダー名,
       "slug": スラッグ,
-      "items": [ {"url": 相対URL, "name": ファイル名, "kind": "image"|"video"}, ... ]
+      "items": [ Item(url=相対URL, name=ファイル名, kind="image"|"video"), ... ]
     }
     """
     if not media_root.exists():
         raise FileNotFoundError(f"MEDIA_DIR が見つかりません: {media_root}")
 
-    tabs: list[dict] = []
-    for sub in sorted(media_root.iterdir(), key=lambda p: p.name.lower()):
-        if not sub.is_dir():
-            continue
-        files = [p for p in sorted(sub.iterdir(), key=lambda p: p.name.lower()) if is_media_file(p)]
-        if not files:
-            continue
-        tab = {
-            "name": sub.name,
-            "slug": sub.name,
-            "items": [],
-        }
-        for f in files:
-            tab["items"].append({
-                "url": rel_url(f),
-                "name": f.name,
-                "kind": "image" if is_image(f) else ("video" if is_video(f) else "other"),
-            })
-        tabs.append(tab)
-    return tabs
-
-
-def render_index_html(tabs: list[dict]) -> str:
-    """タブ・グリッド・モーダル付きの単一 HTML を返す。CSS/JS も同梱。"""
-    # タブボタン
-    tab_buttons_html = []
-    tab_panels_html = []
-
-    # 最初のタブをデフォルトでアクティブ
-    default_active = tabs[0]["slug"] if tabs else ""
-
-    for tab in tabs:
-        name = escape(tab["name"])  # 表示用
-        slug = escape(tab["slug"])  # id/属性用
-        count = len(tab["items"])   # カウント表示
-
-        tab_buttons_html.append(
-            f'<button class="tab-btn" role="tab" data-target="{slug}">' \
-            f'<span class="tab-name">{name}</span>' \
-            f'<span class="tab-count">{count}</span>' \
-            f"</button>"
-        )
-
-        # 各パネルのグリッド
-        tiles = []
-        for item in tab["items"]:
-            url = escape(item["url"])  # 相対URL
-            fname = escape(item["name"])  # alt/label
-            if item["kind"] == "image":
-                tiles.append(
-                    """
-<li class="tile" data-kind="image" data-src="{url}" aria-label="{fname}">
-  <img src="{url}" alt="{fname}" loading="lazy" />
-</li>
-                    """.strip().format(url=url, fname=fname)
-                )
-            elif item["kind"] == "video":
-                tiles.append(
-                    """
-<li class="tile video" data-kind="video" data-src="{url}" aria-label="{fname}">
-  <div class="video-thumb" title="{fname}">
-    <div class="play-icon" aria-hidden="true"></div>
-    <div class="filename">{short}</div>
-  </div>
-</li>
-                    """.strip().format(url=url, fname=fname, short=escape(shorten_name(item["name"])) )
-                )
-        panel_html = (
-            f'<section id="{slug}" class="panel" role="tabpanel" aria-labelledby="tab-{slug}">\n'
-            f'  <ul class="grid">\n    ' + "\n    ".join(tiles) + "\n  </ul>\n"
-            f"</section>"
-        )
-        tab_panels_html.append(panel_html)
-
-    html_doc = f"""<!doctype html>
-<html lang=\"ja\">
-<head>
-  <meta charset=\"utf-8\" />
-  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
-  <title>Local Media Gallery</title>
-  <style>
-    :root {{
-      --bg: #0b0c10;
-      --panel: #111217;
-      --text: #e6e6e6;
-      --muted: #a0a0a0;
-      --accent: #4f46e5;
-      --accent-2: #22d3ee;
-      --border: #23242c;
-      --tile: #151722;
-      --shadow: 0 6px 24px rgba(0,0,0,.35);
-    }}
-    * {{ box-sizing: border-box; }}
-    html, body {{ height: 100%; }}
-    body {{
-      margin: 0; padding: 0;
-      background: linear-gradient(180deg, #0b0c10 0%, #0e1018 100%);
-      color: var(--text);
-      font-family: system-ui, -apple-system, Segoe UI, Roboto, Helvetica, Arial, \"Apple Color Emoji\", \"Segoe UI Emoji\";
-    }}
-    header {{ position: sticky; top: 0; z-index: 20; backdrop-filter: blur(8px); background: rgba(11,12,16,.6); border-bottom: 1px solid var(--border); }}
-    .container {{ max-width: 1200px; margin: 0 auto; padding: 12px 16px; }}
-
-    .title {{ display: flex; align-items: center; gap: 10px; padding: 8px 0 12px; }}
-    .title h1 {{ font-size: 20px; margin: 0; letter-spacing: .2px; }}
-    .badge {{ font-size: 12px; padding: 2px 8px; background: #0f172a; border: 1px solid var(--border); border-radius: 999px; color: var(--muted); }}
-
-    .tabs {{ display: flex; gap: 8px; flex-wrap: wrap; padding-bottom: 10px; }}
-    .tab-btn {{
-      border: 1px solid var(--border);
-      background: linear-gradient(180deg, #151823, #121521);
-      color: var(--text);
-      padding: 8px 10px; border-radius: 10px;
-      cursor: pointer; box-shadow: var(--shadow);
-      display: inline-flex; align-items: center; gap: 8px;
-      transition: transform .08s ease, border-color .15s ease, box-shadow .15s ease;
-    }}
-    .tab-btn:hover {{ transform: translateY(-1px); border-color: #2a2d3a; }}
-    .tab-btn.active {{ outline: 2px solid var(--accent); }}
-    .tab-name {{ font-weight: 600; }}
-    .tab-count {{ font-size: 12px; color: var(--muted); background: #0b0d14; border: 1px solid var(--border); padding: 2px 6px; border-radius: 999px; }}
-
-    main {{ max-width: 1200px; margin: 0 auto; padding: 16px; }}
-    .panel {{ display: none; }}
-    .panel.active {{ display: block; }}
-
-    .grid {{ list-style: none; margin: 0; padding: 0; display: grid; grid-template-columns: repeat(auto-fill, minmax(180px, 1fr)); gap: 14px; }}
-    .tile {{
-      position: relative; background: var(--tile); border: 1px solid var(--border);
-      border-radius: 16px; overflow: hidden; aspect-ratio: 1 / 1; box-shadow: var(--shadow);
-      cursor: pointer; display: flex; align-items: center; justify-content: center;
-      transition: transform .08s ease, border-color .15s ease, box-shadow .15s ease;
-    }}
-    .tile:hover {{ transform: translateY(-2px); border-color: #2a2d3a; }}
-    .tile img {{ width: 100%; height: 100%; object-fit: cover; display: block; }}
-
-    /* 動画タイル */
-    .video .video-thumb {{
-      width: 100%; height: 100%; display: grid; place-items: center;
-      background: radial-gradient(60% 60% at 50% 50%, rgba(34,211,238,.08) 0%, rgba(79,70,229,.08) 100%), #0d101a;
-    }}
-    .video .filename {{ position: absolute; left: 8px; bottom: 8px; font-size: 12px; color: var(--muted); background: rgba(0,0,0,.45); padding: 2px 6px; border-radius: 6px; border: 1px solid rgba(255,255,255,.1); }}
-    .play-icon {{
-      width: 54px; height: 54px; border-radius: 999px; border: 2px solid rgba(255,255,255,.7);
-      display: grid; place-items: center; box-shadow: 0 0 0 6px rgba(255,255,255,.08);
-    }}
-    .play-icon::before {{
-      content: ""; display: block; width: 0; height: 0;
-      border-left: 16px solid rgba(255,255,255,.9);
-      border-top: 10px solid transparent; border-bottom: 10px solid transparent;
-      margin-left: 4px;
-    }}
-
-    /* ビューア（モーダル） */
-    .viewer {{
-      position: fixed; inset: 0; background: rgba(3,6,12,.9);
-      display: none; align-items: center; justify-content: center; padding: 24px; z-index: 50;
-    }}
-    .viewer.active {{ display: flex; }}
-    .viewer .inner {{ position: relative; max-width: 96vw; max-height: 90vh; width: min(1200px, 96vw); }}
-    .viewer .frame {{ background: #000; border-radius: 16px; overflow: hidden; border: 1px solid var(--border); box-shadow: var(--shadow); }}
-    .viewer img, .viewer video {{ display: block; max-width: 100%; max-height: 80vh; margin: 0 auto; }}
-    .viewer .close {{ position: absolute; top: -12px; right: -12px; background: #0f172a; color: #fff; border: 1px solid var(--border); border-radius: 999px; width: 36px; height: 36px; display: grid; place-items: center; cursor: pointer; box-shadow: var(--shadow); }}
-    .viewer .meta {{ margin-top: 10px; text-align: center; color: var(--muted); font-size: 13px; }}
-
-    footer {{ max-width: 1200px; margin: 32px auto 48px; padding: 0 16px; color: var(--muted); font-size: 12px; text-align: center; }}
-    a, a:visited {{ color: var(--accent-2); }}
-  </style>
-</head>
-<body>
-  <header>
-    <div class=\"container\">
-      <div class=\"title\">
-        <h1>Local Media Gallery</h1>
-        <span class=\"badge\">static / generated</span>
-      </div>
-      <nav class=\"tabs\" role=\"tablist\" aria-label=\"Folders\">
-        {''.join(tab_buttons_html)}
-      </nav>
-    </div>
-  </header>
-
-  <main>
-    {''.join(tab_panels_html)}
-  </main>
+    # DirEntry.is_dir()/is_file() は readdir 時の型情報を使うため、通常は stat が発生しない
+    with os.scandir(media_root) as it:
+        subs = [entry for entry in it if entry.is_dir()]
+    media_url = rel_url(media_root)
+    if use_cache:
+        # 消えたフォルダーのキャッシュは捨てる
+        live = {(entry.path, media_url) for entry in subs}
+        for key in [key for key in _scan_cache if key[1] == media_url and key not in live]:
+            del _scan_cache[key]
+    if not subs:
+        return []
+    # sort(key=...) は key を要素ごとに一度だけ計算してから並べる（比較のたびに lower() はしない）ので、
+    # (小文字名, entry) を自前で組んで並べても計算量は減らない
+    subs.sort(key=lambda entry: entry.name.lower())
+
+    # フォルダーごとの走査は I/O 待ちが主なので並列に投げる（ネットワークドライブ上で特に効く）。
+    # map は入力順で結果を返すため、タブの並びは subs のソート順のまま。
+    with ThreadPoolExecutor(max_workers=min(32, len(subs))) as ex:
+        tabs = ex.map(_scan_artist, subs, repeat(media_url), repeat(use_cache))
+        return [tab for tab in tabs if tab is not None]
+
+
+# ===== 静的アセット =====
+# CSS/JS は index.html に埋め込まず assets/ に別ファイルとして書き出す（ブラウザのキャッシュが効く）。
+# 参照 URL には内容のハッシュを付け、中身が変わったときだけ再取得されるようにする。
+GALLERY_CSS = """:root {
+  --bg: #0b0c10;
+  --panel: #111217;
+  --text: #e6e6e6;
+  --muted: #a0a0a0;
+  --accent: #4f46e5;
+  --accent-2: #22d3ee;
+  --border: #23242c;
+  --tile: #151722;
+  --shadow: 0 6px 24px rgba(0,0,0,.35);
+}
+* { box-sizing: border-box; }
+html, body { height: 100%; }
+body {
+  margin: 0; padding: 0;
+  background: linear-gradient(180deg, #0b0c10 0%, #0e1018 100%);
+  color: var(--text);
+  font-family: system-ui, -apple-system, Segoe UI, Roboto, Helvetica, Arial, "Apple Color Emoji", "Segoe UI Emoji";
+}
+header { position: sticky; top: 0; z-index: 20; backdrop-filter: blur(8px); background: rgba(11,12,16,.6); border-bottom: 1px solid var(--border); }
+.container { max-width: 1200px; margin: 0 auto; padding: 12px 16px; }
+
+.title { display: flex; align-items: center; gap: 10px; padding: 8px 0 12px; }
+.title h1 { font-size: 20px; margin: 0; letter-spacing: .2px; }
+.badge { font-size: 12px; padding: 2px 8px; background: #0f172a; border: 1px solid var(--border); border-radius: 999px; color: var(--muted); }
+
+.tabs { display: flex; gap: 8px; flex-wrap: wrap; padding-bottom: 10px; }
+.tab-btn {
+  border: 1px solid var(--border);
+  background: linear-gradient(180deg, #151823, #121521);
+  color: var(--text);
+  padding: 8px 10px; border-radius: 10px;
+  cursor: pointer; box-shadow: var(--shadow);
+  display: inline-flex; align-items: center; gap: 8px;
+  transition: transform .08s ease, border-color .15s ease, box-shadow .15s ease;
+}
+.tab-btn:hover { transform: translateY(-1px); border-color: #2a2d3a; }
+.tab-btn.active { outline: 2px solid var(--accent); }
+.tab-name { font-weight: 600; }
+.tab-count { font-size: 12px; color: var(--muted); background: #0b0d14; border: 1px solid var(--border); padding: 2px 6px; border-radius: 999px; }
+
+main { max-width: 1200px; margin: 0 auto; padding: 16px; }
+.panel { display: none; }
+.panel.active { display: block; }
+
+.grid { list-style: none; margin: 0; padding: 0; display: grid; grid-template-columns: repeat(auto-fill, minmax(180px, 1fr)); gap: 14px; }
+.tile {
+  position: relative; background: var(--tile); border: 1px solid var(--border);
+  border-radius: 16px; overflow: hidden; aspect-ratio: 1 / 1; box-shadow: var(--shadow);
+  cursor: pointer; display: flex; align-items: center; justify-content: center;
+  transition: transform .08s ease, border-color .15s ease, box-shadow .15s ease;
+}
+.tile:hover { transform: translateY(-2px); border-color: #2a2d3a; }
+.tile img { width: 100%; height: 100%; object-fit: cover; display: block; }
 
-  <div id=\"viewer\" class=\"viewer\" aria-hidden=\"true\">
-    <div class=\"inner\">
-      <button class=\"close\" aria-label=\"Close\">✕</button>
-      <div class=\"frame\"></div>
-      <div class=\"meta\"></div>
-    </div>
-  </div>
+/* 動画タイル */
+.video .video-thumb {
+  width: 100%; height: 100%; display: grid; place-items: center;
+  background: radial-gradient(60% 60% at 50% 50%, rgba(34,211,238,.08) 0%, rgba(79,70,229,.08) 100%), #0d101a;
+}
+.video .filename { position: absolute; left: 8px; bottom: 8px; font-size: 12px; color: var(--muted); background: rgba(0,0,0,.45); padding: 2px 6px; border-radius: 6px; border: 1px solid rgba(255,255,255,.1); }
+.play-icon {
+  width: 54px; height: 54px; border-radius: 999px; border: 2px solid rgba(255,255,255,.7);
+  display: grid; place-items: center; box-shadow: 0 0 0 6px rgba(255,255,255,.08);
+}
+.play-icon::before {
+  content: ""; display: block; width: 0; height: 0;
+  border-left: 16px solid rgba(255,255,255,.9);
+  border-top: 10px solid transparent; border-bottom: 10px solid transparent;
+  margin-left: 4px;
+}
 
-  <footer>
-    生成物: <code>index.html</code> ・ メディアは <code>media/</code> 配下の各フォルダへ入れるだけ
-  </footer>
+/* ビューア（モーダル） */
+.viewer {
+  position: fixed; inset: 0; background: rgba(3,6,12,.9);
+  display: none; align-items: center; justify-content: center; padding: 24px; z-index: 50;
+}
+.viewer.active { display: flex; }
+.viewer .inner { position: relative; max-width: 96vw; max-height: 90vh; width: min(1200px, 96vw); }
+.viewer .frame { background: #000; border-radius: 16px; overflow: hidden; border: 1px solid var(--border); box-shadow: var(--shadow); }
+.viewer img, .viewer video { display: block; max-width: 100%; max-height: 80vh; margin: 0 auto; }
+.viewer .close { position: absolute; top: -12px; right: -12px; background: #0f172a; color: #fff; border: 1px solid var(--border); border-radius: 999px; width: 36px; height: 36px; display: grid; place-items: center; cursor: pointer; box-shadow: var(--shadow); }
+.viewer .meta { margin-top: 10px; text-align: center; color: var(--muted); font-size: 13px; }
+
+footer { max-width: 1200px; margin: 32px auto 48px; padding: 0 16px; color: var(--muted); font-size: 12px; text-align: center; }
+a, a:visited { color: var(--accent-2); }
+"""
 
-<script>
-(function(){{
+GALLERY_JS = """(function(){
   const $ = (sel, root=document) => root.querySelector(sel);
   const $$ = (sel, root=document) => Array.from(root.querySelectorAll(sel));
 
+  // タブごとのファイル一覧（index.html に JSON で埋め込まれている）
+  // items の各要素は [url, name, kind]
+  const data = JSON.parse($('#gallery-data').textContent);
+  const bySlug = new Map(data.map(tab => [tab.slug, tab]));
+
+  // ファイル名を max 文字に縮める（拡張子はなるべく残す）
+  function shortenName(name, max = 22) {
+    if (name.length <= max) return name;
+    const i = name.lastIndexOf('.');
+    const stem = i >= 0 ? name.slice(0, i) : name;
+    let ext = i >= 0 ? name.slice(i) : '';
+    if (ext.length > 6) ext = ext.slice(0, 6) + '…';
+    const keep = Math.max(3, max - ext.length - 1);  // 1 は省略記号
+    return stem.slice(0, keep) + '…' + ext;
+  }
+
+  // 画像タイルは画面に近づいてから <img> を入れる
+  const imgObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+          if (!entry.isIntersecting) return;
+          imgObserver.unobserve(entry.target);
+          attachImage(entry.target);
+        });
+      }, { rootMargin: '200px' })
+    : null;
+
+  function attachImage(tile) {
+    const img = document.createElement('img');
+    img.src = tile.dataset.src;
+    img.alt = tile.getAttribute('aria-label');
+    img.loading = 'lazy';
+    tile.appendChild(img);
+  }
+
+  // 種別ごとのタイルの雛形。一度だけ組み立て、各タイルは cloneNode で複製する
+  function el(tag, className, ...children) {
+    const node = document.createElement(tag);
+    node.className = className;
+    node.append(...children);
+    return node;
+  }
+  const playIcon = el('div', 'play-icon');
+  playIcon.setAttribute('aria-hidden', 'true');
+  const TILE_PROTOS = {
+    image: el('li', 'tile'),
+    video: el('li', 'tile video', el('div', 'video-thumb', playIcon, el('div', 'filename'))),
+  };
+  Object.entries(TILE_PROTOS).forEach(([kind, proto]) => { proto.dataset.kind = kind; });
+
+  // 複製したタイルに種別ごとの中身を入れる。kind で引くだけで分岐しない
+  const TILE_BUILDERS = {
+    image(li) {
+      if (imgObserver) imgObserver.observe(li);
+      else attachImage(li);
+    },
+    video(li, name) {
+      const thumb = li.firstChild;
+      thumb.title = name;
+      thumb.lastChild.textContent = shortenName(name);
+    },
+  };
+
+  function buildTile([url, name, kind]) {
+    const proto = TILE_PROTOS[kind];
+    if (!proto) return null;
+    const li = proto.cloneNode(true);
+    li.dataset.src = url;
+    li.setAttribute('aria-label', name);
+    TILE_BUILDERS[kind](li, name);
+    return li;
+  }
+
+  // パネルの中身は初めて開いたときにまとめて生成する
+  function renderPanel(panel) {
+    if (panel.dataset.rendered) return;
+    panel.dataset.rendered = '1';
+    const tab = bySlug.get(panel.id);
+    if (!tab) return;
+    const frag = document.createDocumentFragment();
+    tab.items.forEach(item => {
+      const li = buildTile(item);
+      if (li) frag.appendChild(li);
+    });
+    $('.grid', panel).appendChild(frag);
+  }
+
   // タブ切り替え
   const tabs = $$('.tab-btn');
   const panels = $$('.panel');
   const KEY = 'gallery:lastTab';
 
-  function activate(slug) {{
+  function activate(slug) {
     tabs.forEach(btn => btn.classList.toggle('active', btn.dataset.target === slug));
-    panels.forEach(p => p.classList.toggle('active', p.id === slug));
+    panels.forEach(p => {
+      const on = p.id === slug;
+      p.classList.toggle('active', on);
+      if (on) renderPanel(p);
+    });
     localStorage.setItem(KEY, slug);
-  }}
+  }
 
   tabs.forEach(btn => btn.addEventListener('click', () => activate(btn.dataset.target)));
 
-  // 初期アクティブ（ローカルストレージ優先）
-  const initial = localStorage.getItem(KEY) || '{default_active}';
+  // 初期アクティブ（ローカルストレージ優先。消えたフォルダーなら既定のタブ）
+  const saved = localStorage.getItem(KEY);
+  const initial = bySlug.has(saved) ? saved : $('main').dataset.defaultTab;
   if (initial) activate(initial);
 
   // ビューア（モーダル）
@@ -301,70 +411,315 @@ def render_index_html(tabs: list[dict]) -> str:
   const meta = $('.meta', viewer);
   const closeBtn = $('.close', viewer);
 
-  function openViewer(kind, src, name) {{
-    frame.innerHTML = '';
-    meta.textContent = name || '';
-    if (kind === 'image') {{
+  // 種別ごとのビューア要素
+  const VIEWERS = {
+    image(src, name) {
       const img = new Image();
-      img.src = src; img.alt = name || '';
+      img.src = src; img.alt = name;
       img.loading = 'eager';
-      frame.appendChild(img);
-    }} else if (kind === 'video') {{
+      return img;
+    },
+    video(src) {
       const v = document.createElement('video');
       v.src = src; v.controls = true; v.autoplay = true; v.playsInline = true;
-      frame.appendChild(v);
-    }}
+      return v;
+    },
+  };
+
+  function openViewer(kind, src, name) {
+    const make = VIEWERS[kind];
+    if (!make) return;
+    frame.replaceChildren(make(src, name || ''));
+    meta.textContent = name || '';
     viewer.classList.add('active');
     viewer.setAttribute('aria-hidden', 'false');
-  }}
+  }
 
-  function closeViewer() {{
+  function closeViewer() {
     viewer.classList.remove('active');
     viewer.setAttribute('aria-hidden', 'true');
     frame.innerHTML = '';
-  }}
+  }
 
   closeBtn.addEventListener('click', closeViewer);
-  viewer.addEventListener('click', (e) => {{ if (e.target === viewer) closeViewer(); }});
-  document.addEventListener('keydown', (e) => {{ if (e.key === 'Escape') closeViewer(); }});
-
-  // タイルクリックで開く
-  $$('.grid .tile').forEach(tile => {{
-    tile.addEventListener('click', () => {{
-      const kind = tile.dataset.kind;
-      const src  = tile.dataset.src;
-      const name = tile.getAttribute('aria-label') || '';
-      openViewer(kind, src, name);
-    }});
-  }});
-}})();
-
-</script>
+  viewer.addEventListener('click', (e) => { if (e.target === viewer) closeViewer(); });
+  document.addEventListener('keydown', (e) => { if (e.key === 'Escape') closeViewer(); });
+
+  // タイルクリックで開く（タイルは後から生成されるので main でまとめて受ける）
+  $('main').addEventListener('click', (e) => {
+    const tile = e.target.closest('.tile');
+    if (!tile) return;
+    openViewer(tile.dataset.kind, tile.dataset.src, tile.getAttribute('aria-label') || '');
+  });
+})();
+"""
+
+ASSET_FILES = ("gallery.css", "gallery.js")
+
+
+def asset_version(text: str) -> str:
+    """アセットのキャッシュバスター（内容の blake2b ハッシュ 8 桁）。"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=4).hexdigest()
+
+
+def write_assets(assets_dir: Path, minify: bool = True) -> bool:
+    """
+    CSS/JS を assets_dir に書き出す。同じ内容のファイルが既にあれば触らない。
+    一つでも書き換えたら True（index.html 側の ?v= も作り直す必要がある）。
+    """
+    parts = page_parts(minify)
+    assets_dir.mkdir(exist_ok=True)
+    changed = False
+    for filename in ASSET_FILES:
+        path = assets_dir / filename
+        data = parts[filename].encode("utf-8")
+        if path.exists() and path.read_bytes() == data:
+            continue
+        path.write_bytes(data)
+        changed = True
+    return changed
+
+
+# ===== HTML シェル =====
+# 静的な部分はモジュール定数として一度だけ用意し、生成時は動的部分を差し込んで連結するだけにする。
+# 実際に使うのは page_parts() が返すもの（--debug 以外では縮小済み）。
+HTML_HEAD = """<!doctype html>
+<html lang="ja">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>Local Media Gallery</title>
+  <link rel="stylesheet" href="assets/gallery.css?v=%s" />
+</head>
+<body>
+  <header>
+    <div class="container">
+      <div class="title">
+        <h1>Local Media Gallery</h1>
+        <span class="badge">static / generated</span>
+      </div>
+      <nav class="tabs" role="tablist" aria-label="Folders">
+        """  # (css_version)
+
+HTML_MAIN_OPEN = """
+      </nav>
+    </div>
+  </header>
+
+  <main data-default-tab="%s">
+"""  # (default_active)
+
+HTML_TAIL = """
+  </main>
+
+  <div id="viewer" class="viewer" aria-hidden="true">
+    <div class="inner">
+      <button class="close" aria-label="Close">✕</button>
+      <div class="frame"></div>
+      <div class="meta"></div>
+    </div>
+  </div>
+
+  <footer>
+    生成物: <code>index.html</code> ・ メディアは <code>media/</code> 配下の各フォルダへ入れるだけ
+  </footer>
+
+"""
+
+HTML_END = """<script src="assets/gallery.js?v=%s" defer></script>
 </body>
 </html>
+"""  # (js_version)
+
+
+TAB_BUTTON_TMPL = (
+    '<button class="tab-btn" role="tab" data-target="%s">'
+    '<span class="tab-name">%s</span>'
+    '<span class="tab-count">%d</span>'
+    "</button>"
+)  # (slug, name, count)
+
+PANEL_TMPL = """<section id="%s" class="panel" role="tabpanel" aria-labelledby="tab-%s">
+  <ul class="grid"></ul>
+</section>
+"""  # (slug, slug)。タイルは gallery.js が gallery-data から生成する
+
+DATA_OPEN = """<script type="application/json" id="gallery-data">"""
+DATA_CLOSE = """</script>
 """
-    return html_doc
 
 
-def shorten_name(name: str, max_len: int = 22) -> str:
-    base = name
-    if len(base) <= max_len:
-        return base
-    # 拡張子はなるべく残す
-    stem = Path(base).stem
-    ext = Path(base).suffix
-    if len(ext) > 6:
-        ext = ext[:6] + '…'
-    keep = max_len - len(ext) - 1  # 1 は省略記号
-    if keep < 3:
-        keep = 3
-    return stem[:keep] + '…' + ext
+# ===== 縮小（minify） =====
+_HTML_GAP_RE = re.compile(r">\s+<")
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{};,])\s*")
+
+
+def minify_html(html: str) -> str:
+    """タグ間の空白・改行を詰める（テキスト中の空白は残す）。"""
+    return _HTML_GAP_RE.sub("><", html).strip()
+
+
+def minify_css(css: str) -> str:
+    """コメントと余分な空白を取り除く。"""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css)
+    return css.replace(";}", "}").replace(": ", ":").strip()
 
 
-def main() -> None:
+def minify_js(js: str) -> str:
+    """行コメント・インデント・空行を取り除く。自動セミコロン挿入を壊さないよう改行は残す。"""
+    lines = (line.strip() for line in js.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+@lru_cache(maxsize=None)
+def page_parts(minify: bool) -> dict[str, str]:
+    """
+    ページを組み立てる部品（HTML 断片の % テンプレートと CSS/JS）を返す。
+    minify=True なら縮小済み。モードごとに一度だけ作る。
+    """
+    if minify:
+        css, js, html = minify_css(GALLERY_CSS), minify_js(GALLERY_JS), minify_html
+    else:
+        css, js, html = GALLERY_CSS, GALLERY_JS, str
+    return {
+        "gallery.css": css,
+        "gallery.js": js,
+        "head": html(HTML_HEAD % asset_version(css)),
+        "main_open": html(HTML_MAIN_OPEN),
+        "tail": html(HTML_TAIL),
+        "end": html(HTML_END % asset_version(js)),
+        "tab_button": html(TAB_BUTTON_TMPL),
+        "panel": html(PANEL_TMPL),
+        "data_open": html(DATA_OPEN),
+        "data_close": html(DATA_CLOSE),
+    }
+
+
+def _py_json_dumps(obj: object) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# orjson があればそちらを使う（bytes を直接返すので再エンコードも不要）。
+# Item のような NamedTuple はそのままでは扱えないので default で tuple に落とす
+try:
+    import orjson
+except ImportError:
+    _json_dumps = _py_json_dumps
+else:
+    def _json_dumps(obj: object) -> bytes:
+        return orjson.dumps(obj, default=tuple)
+
+
+def gallery_json(tabs: list[dict]) -> bytes:
+    """
+    タブのデータを <script type="application/json"> に埋め込める JSON（UTF-8）にする。
+    Item はタプルなので [url, name, kind] の配列になる。"</script>" で閉じられないよう "<" はエスケープする。
+    """
+    return _json_dumps(tabs).replace(b"<", b"\\u003c")
+
+
+def iter_html(tabs: list[dict], default_active: str, minify: bool = True) -> Iterator[str | bytes]:
+    """
+    タブ・パネル・モーダル付きの HTML を断片ごとに yield する。CSS/JS は assets/ を参照する。
+    タイルは HTML にせず JSON で埋め込み、ブラウザ側でタブを開いたときに生成する。
+    """
+    parts = page_parts(minify)
+    yield parts["head"]
+
+    # タブボタン
+    tab_button = parts["tab_button"]
+    for tab in tabs:
+        name = e(tab["name"])  # 表示用
+        slug = e(tab["slug"])  # id/属性用
+        count = len(tab["items"])   # カウント表示
+        yield tab_button % (slug, name, count)
+
+    yield parts["main_open"] % e(default_active)
+
+    # 各パネル（中身は空。gallery.js が埋める）
+    panel = parts["panel"]
+    for tab in tabs:
+        slug = e(tab["slug"])
+        yield panel % (slug, slug)
+
+    yield parts["tail"]
+    yield parts["data_open"]
+    yield gallery_json(tabs)
+    yield parts["data_close"]
+    yield parts["end"]
+
+
+def write_fragments(path: Path, fragments: Iterable[str | bytes]) -> None:
+    """
+    fragments を UTF-8 で path に書き出す（bytes の断片はそのまま）。テキスト I/O 層（逐次エンコード・改行変換）は通さない。
+    POSIX では連結せずに writev でまとめて書き、それ以外では一つの bytes にして書く。
+    """
+    chunks = [b for b in (f.encode("utf-8") if isinstance(f, str) else f for f in fragments) if b]
+    if not hasattr(os, "writev"):
+        path.write_bytes(b"".join(chunks))
+        return
+
+    try:
+        iov_max = os.sysconf("SC_IOV_MAX")
+    except (ValueError, OSError):
+        iov_max = 1024
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        i = 0
+        while i < len(chunks):
+            n = os.writev(fd, chunks[i:i + iov_max])
+            # 書き切れなかった分は次の writev に回す
+            while i < len(chunks) and n >= len(chunks[i]):
+                n -= len(chunks[i])
+                i += 1
+            if n:
+                chunks[i] = chunks[i][n:]
+    finally:
+        os.close(fd)
+
+
+def is_up_to_date(media_root: Path, output: Path) -> bool:
+    """
+    output が media_root・その直下のフォルダー・このスクリプトのどれよりも新しければ True。
+    フォルダーの mtime はファイルの追加・削除・リネームで更新されるので、中身の走査は不要。
+    output の mtime は main() が走査開始時刻に揃えている（走査中の変更を取りこぼさないため）。
+    mtime の粒度が粗いファイルシステムもあるので、同じ時刻は「変更あり」として扱う。
+    """
+    if not output.exists() or not media_root.exists():
+        return False
+    out_ns = output.stat().st_mtime_ns
+    if Path(__file__).stat().st_mtime_ns >= out_ns or media_root.stat().st_mtime_ns >= out_ns:
+        return False
+    with os.scandir(media_root) as it:
+        return all(entry.stat().st_mtime_ns < out_ns for entry in it if entry.is_dir())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="media/ 配下からギャラリー index.html を生成します。")
+    parser.add_argument("--force", action="store_true", help="media/ に変更が無くても再生成する")
+    parser.add_argument("--debug", action="store_true", help="HTML/CSS/JS を縮小せずに出力する（--force を兼ねる）")
+    args = parser.parse_args(argv)
+    minify = not args.debug
+
+    # アセットを書き換えた（--debug との切り替えなど）ときは、参照する ?v= が古くなるので作り直す
+    assets_changed = write_assets(ASSETS_DIR, minify)
+    if not (args.force or args.debug or assets_changed) and is_up_to_date(MEDIA_DIR, OUTPUT_HTML):
+        print(f"✅ ギャラリーは最新です（再生成するには --force）: {OUTPUT_HTML}")
+        return
+
+    # 走査中に追加されたファイルを次回拾えるよう、index.html の mtime は走査開始時刻にする。
+    # ファイルシステムのタイムスタンプは time.time_ns() より粗い・遅れることがある（FAT/SMB は 2 秒単位）ので余裕を持たせる。
+    # 余裕の分だけ直前の変更で次回もう一度作り直すことがあるが、取りこぼすよりはよい
+    start_ns = time.time_ns() - MTIME_SLACK_NS
     tabs = build_gallery_data(MEDIA_DIR)
-    html = render_index_html(tabs)
-    OUTPUT_HTML.write_text(html, encoding='utf-8')
+    # 最初のタブをデフォルトでアクティブ
+    default_active = tabs[0]["slug"] if tabs else ""
+    write_fragments(OUTPUT_HTML, iter_html(tabs, default_active, minify))
+    os.utime(OUTPUT_HTML, ns=(start_ns, start_ns))
     print(f"✅ ギャラリーを生成しました: {OUTPUT_HTML}")
 
 
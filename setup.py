@@ -0,0 +1,13 @@
+"""
+任意の高速化拡張 _scan_fast をビルドする（POSIX のみ。Cython が必要）。
+
+  $ python setup.py build_ext --inplace
+"""
+
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    py_modules=[],
+    ext_modules=cythonize(["_scan_fast.pyx"], language_level=3),
+)